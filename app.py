@@ -1,51 +1,137 @@
 # app.py  –  Stock API proxy (InvestSMART)
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
+from flask_caching import Cache
 from flask_cors import CORS
-import requests, re, yfinance as yf
-from bs4 import BeautifulSoup
+import calendar, hashlib, hmac, json, orjson, os, requests, re, tempfile, threading, time
+import yfinance as yf
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from lxml import etree, html as lxml_html
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, date, timedelta
+from functools import lru_cache
+from operator import mul
+from pathlib import Path
+from zoneinfo import ZoneInfo
 
 app = Flask(__name__)
 CORS(app)
 
+RESPONSE_TTL = 60                        # seconds a /stock answer is reused
+# REDIS_URL set → one cache shared by every worker (needs `pip install redis`);
+# otherwise a per-process in-memory cache
+if os.environ.get("REDIS_URL"):
+    _cache_cfg = {"CACHE_TYPE": "RedisCache",
+                  "CACHE_REDIS_URL": os.environ["REDIS_URL"],
+                  "CACHE_KEY_PREFIX": "stock-api:"}
+else:
+    _cache_cfg = {"CACHE_TYPE": "SimpleCache"}
+cache = Cache(app, config={**_cache_cfg, "CACHE_DEFAULT_TIMEOUT": RESPONSE_TTL})
+
 UA = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
     "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36"
 )
+SYDNEY = ZoneInfo("Australia/Sydney")
+HEADERS = {
+    "User-Agent":      UA,
+    "Accept":          "text/html",
+    "Accept-Encoding": "gzip, deflate, br",   # requests decompresses for us
+}
+
+# one keep-alive pool per process: repeat scrapes skip the TCP + TLS handshake
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    # pool as deep as EXECUTOR, else concurrent scrapes open throwaway sockets
+    pool_connections=4, pool_maxsize=32,
+    # ride out a brief upstream blip instead of caching a failure, but don't
+    # resend after a read timeout – that alone would eat the scrape deadline
+    max_retries=Retry(total=2, connect=1, read=0, backoff_factor=0.3,
+                      status_forcelist=(502, 503, 504)),
+))
+HTTP_TIMEOUT = (3.05, 10)                # (connect, read) – a dead host fails fast
+INVESTSMART  = "https://www.investsmart.com.au"
+
+# price + dividend lookups are independent I/O, run them side by side
+EXECUTOR = ThreadPoolExecutor(max_workers=32)      # keep pool_maxsize in step
+MAX_BATCH = 20                           # symbols per /stocks call
+PRICE_TIMEOUT  = 20                      # seconds /stock waits on each lookup,
+SCRAPE_TIMEOUT = 30                      # counted from when both were submitted
 
 # ------------------------------------------------------------------ #
 # helpers
 # ------------------------------------------------------------------ #
+@lru_cache(maxsize=4096)      # a watchlist sends the same few symbols all day
 def normalise(raw: str) -> str:
     """'vhy' → 'VHY.AX'.  If suffix already supplied, keep it."""
     s = raw.strip().upper()
     return s if "." in s else f"{s}.AX"
 
 
+_NON_NUM_RE = re.compile(r"[^\d.]")    # compiled once, used on every row
+
+_UNPARSED_MAX = 64
+_unparsed_samples: set[str] = set()     # odd ex-date strings, logged once each
+
+
+# nbsp → space, unicode dashes → '-'  in a single pass
+_EXDATE_TRANS = str.maketrans({
+    "\u00a0": " ", "\u2011": "-", "\u2012": "-", "\u2013": "-", "\u2014": "-",
+})
+# '15 Aug 2025' · '15 August 2025' · '15-Aug-2025' · '15/08/2025'
+_DMY_RE = re.compile(r"(\d{1,2})[ /-]+([A-Za-z]{3,9}|\d{1,2})[ /-]+(\d{4})$")
+_ISO_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})$")
+_MONTHS = {m.lower(): i for i, m in enumerate(calendar.month_abbr) if m}
+_MONTHS.update({m.lower(): i for i, m in enumerate(calendar.month_name) if m})
+_MONTHS["sept"] = 9
+
+
+@lru_cache(maxsize=4096)      # same ex-dates recur across tickers and scrapes
 def parse_exdate(txt: str) -> date | None:
-    """Handle the few date formats InvestSMART uses."""
-    txt = txt.strip()
-    for fmt in ("%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%d/%m/%Y"):
+    """Handle the few date formats InvestSMART uses (plus ISO as a fallback)."""
+    # collapse runs of spaces / tabs / markup newlines like strptime's ' ' did
+    txt = " ".join(txt.translate(_EXDATE_TRANS).split())
+    if len(txt) < 8 or not txt[0].isdigit():    # '-', 'N/A', … – not a date
+        return None
+
+    # regex + month table: no strptime, no ValueError per failed format
+    if m := _DMY_RE.match(txt):
+        d, mon, y = m.groups()
+        mn = int(mon) if mon.isdigit() else _MONTHS.get(mon.lower())
+    elif m := _ISO_RE.match(txt):
+        y, mn, d = m.groups()
+        mn = int(mn)
+    else:
+        mn = None
+    if mn:
         try:
-            return datetime.strptime(txt, fmt).date()
-        except ValueError:
-            continue
+            return date(int(y), mn, int(d))
+        except ValueError:                      # e.g. 31/02/2025
+            pass
+
+    if txt not in _unparsed_samples and len(_unparsed_samples) < _UNPARSED_MAX:
+        _unparsed_samples.add(txt)
+        print("Unparsed ex-date:", repr(txt))
     return None
 
 
+_AMOUNT_DROP    = str.maketrans("", "", "$, \u00a0")    # '$1,234.50' → '1234.50'
+_CENTS_SUFFIXES = ("¢", "c", "cpu", "cent", "cents")
+
+
 def clean_amount(cell_text: str) -> float | None:
-    """'$2.43'  → 2.43   |   '61.79¢' → 0.6179"""
-    t = cell_text.strip().replace("$", "")
-    if "¢" in t:
-        t = t.replace("¢", "")
-        try:
-            return float(t) / 100.0
-        except ValueError:
-            return None
+    """'$2.43'  → 2.43   |   '61.79¢' → 0.6179   |   '12.5 cpu' → 0.125"""
+    t = cell_text.translate(_AMOUNT_DROP).strip().lower()
+    cents = t.endswith(_CENTS_SUFFIXES)
+    if cents:
+        t = t.rstrip("¢centspu")
     try:
-        return float(t)
+        v = float(t)
     except ValueError:
         return None
+    return v / 100.0 if cents else v
 
 
 def previous_fy_bounds(today: date | None = None) -> tuple[date, date]:
@@ -55,8 +141,12 @@ def previous_fy_bounds(today: date | None = None) -> tuple[date, date]:
     • If today is 2025-03-15 → bounds are 2023-07-01 … 2024-06-30
     """
     if today is None:
-        today = datetime.utcnow().date()
+        today = datetime.now(SYDNEY).date()     # the FY turns over in AU time
+    return _fy_bounds(today)
+
 
+@lru_cache(maxsize=4)         # one new answer a day; same date objects reused
+def _fy_bounds(today: date) -> tuple[date, date]:
     if today.month >= 7:           # we are already in the new FY
         start_year = today.year - 1
     else:                          # still in Jan-Jun → go back two
@@ -67,65 +157,353 @@ def previous_fy_bounds(today: date | None = None) -> tuple[date, date]:
     return start, end
 
 
+def ojson(status: int = 200, body=None, **fields) -> Response:
+    """jsonify() stand-in: orjson writes the UTF-8 body straight to bytes."""
+    return Response(orjson.dumps(fields if body is None else body),
+                    status=status, mimetype="application/json")
+
+
+# ------------------------------------------------------------------ #
+# live price  (Yahoo via yfinance)
+# ------------------------------------------------------------------ #
+PRICE_TTL       = 60                             # seconds
+PRICE_CACHE_MAX = 2048                           # symbols held at once
+
+_TICKERS: dict[str, yf.Ticker] = {}
+_PRICE_CACHE: dict[str, tuple[float, float]] = {}   # symbol → (price, expires)
+_PRICE_LOCK = threading.Lock()
+
+
+def _bounded_put(cache: dict, key, value, limit: int) -> None:
+    """Insert into a plain dict used as a cache, evicting oldest entries first."""
+    if key not in cache and len(cache) >= limit:
+        cache.pop(next(iter(cache)))
+    cache[key] = value
+
+
+def fetch_price(symbol: str) -> float:
+    """
+    Last traded price for a full Yahoo symbol e.g. 'VHY.AX'.
+    Tickers are reused and quotes held for PRICE_TTL seconds so a burst of
+    dashboard refreshes costs one Yahoo round-trip.  Raises on failure.
+    """
+    now = time.monotonic()
+    with _PRICE_LOCK:
+        hit = _PRICE_CACHE.get(symbol)
+        if hit and hit[1] > now:
+            return hit[0]
+        tkr = _TICKERS.get(symbol)
+        if tkr is None:
+            tkr = yf.Ticker(symbol)
+            _bounded_put(_TICKERS, symbol, tkr, PRICE_CACHE_MAX)
+
+    price = float(tkr.fast_info["lastPrice"])
+    with _PRICE_LOCK:
+        _bounded_put(_PRICE_CACHE, symbol, (price, time.monotonic() + PRICE_TTL),
+                     PRICE_CACHE_MAX)
+    return price
+
+
+# ------------------------------------------------------------------ #
+# page fetch  (conditional GET)
+# ------------------------------------------------------------------ #
+HTTP_CACHE_MAX = 512
+PAGE_CACHE_TTL = 24 * 3600               # younger pages are reused without asking
+PAGE_CACHE_DIR = Path(os.environ.get("PAGE_CACHE_DIR", "cache"))
+
+# url → (etag, last_modified, fetched_at).  Bodies (200-500 KB each) are kept
+# on disk only: get_page runs on a stats-cache miss, and holding hundreds of
+# them per worker would just duplicate the files.  The disk copy also lets a
+# restarted worker skip re-downloading every page
+_HTTP_CACHE: dict[str, tuple[str | None, str | None, float]] = {}
+_HTTP_LOCK = threading.Lock()
+
+
+def _disk_stem(url: str) -> Path:
+    return PAGE_CACHE_DIR / hashlib.md5(url.encode()).hexdigest()
+
+
+def _disk_meta(url: str) -> tuple[str | None, str | None, float] | None:
+    try:
+        meta = json.loads(_disk_stem(url).with_suffix(".json").read_text())
+        return meta["etag"], meta["lastmod"], float(meta["ts"])
+    except (OSError, ValueError, KeyError, TypeError):   # missing or mangled sidecar
+        return None
+
+
+def _disk_body(url: str) -> bytes | None:
+    try:
+        return _disk_stem(url).with_suffix(".html").read_bytes()
+    except OSError:
+        return None
+
+
+def _write_file(path: Path, data: bytes) -> None:
+    # own tmp file per write (threads share a pid), then an atomic replace
+    fd, tmp = tempfile.mkstemp(dir=PAGE_CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _remember_page(url: str, etag: str | None, lastmod: str | None, ts: float,
+                   body: bytes | None = None) -> None:
+    """Record a fetch; body=None keeps the stored body (a 304)."""
+    stem = _disk_stem(url)
+    try:
+        PAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # body first, then metadata, so readers never see halves
+        if body is not None:
+            _write_file(stem.with_suffix(".html"), body)
+        _write_file(stem.with_suffix(".json"),
+                    json.dumps({"url": url, "etag": etag,
+                                "lastmod": lastmod, "ts": ts}).encode())
+    except OSError as e:                 # read-only FS etc. – just refetch next time
+        print("Page cache write failed:", e)
+        return
+    with _HTTP_LOCK:
+        _bounded_put(_HTTP_CACHE, url, (etag, lastmod, ts), HTTP_CACHE_MAX)
+
+
+def get_page(url: str, not_before: float = 0.0) -> bytes:
+    """
+    GET url and return the raw body.  A copy younger than PAGE_CACHE_TTL and
+    fetched after `not_before` (a time.time() value) is returned as is; any
+    other is revalidated with If-None-Match / If-Modified-Since, and a 304
+    reuses the stored bytes.
+    Raises on network / HTTP errors.
+    """
+    with _HTTP_LOCK:
+        meta = _HTTP_CACHE.get(url)
+    if meta is None:
+        meta = _disk_meta(url)
+    body = _disk_body(url) if meta else None
+    if body is None:
+        meta = None                      # nothing stored to reuse – plain GET
+    elif meta[2] > not_before and time.time() - meta[2] < PAGE_CACHE_TTL:
+        return body
+
+    headers = {}
+    if meta:
+        etag, lastmod, _ = meta
+        if etag:
+            headers["If-None-Match"] = etag
+        if lastmod:
+            headers["If-Modified-Since"] = lastmod
+
+    res = SESSION.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+    if res.status_code == 304 and meta:
+        _remember_page(url, *meta[:2], time.time())
+        return body
+    res.raise_for_status()
+
+    _remember_page(url, res.headers.get("ETag"), res.headers.get("Last-Modified"),
+                   time.time(), res.content)
+    return res.content
+
+
+def warm_pool() -> None:
+    """Open a keep-alive connection to InvestSMART before the first scrape."""
+    try:
+        SESSION.head(INVESTSMART, timeout=HTTP_TIMEOUT)
+    except requests.RequestException as e:
+        print("Connection warm-up failed:", e)
+
+
+# ------------------------------------------------------------------ #
+# invalidation stamps  (seen by every worker)
+# ------------------------------------------------------------------ #
+# /invalidate and /cache/clear land on one gunicorn worker.  They leave a
+# wall-clock stamp where every worker can read it – Redis when REDIS_URL is
+# set, else a file's mtime under PAGE_CACHE_DIR – and a lookup keys its
+# cached stats on the stamp and ignores pages fetched before it.
+STAMP_DIR = PAGE_CACHE_DIR / "stamps"
+ALL_CODES = "_all"                       # stamp bumped by /cache/clear
+
+_LOCAL_STAMPS: dict[str, float] = {}     # this worker's own bumps, in case
+_STAMP_LOCK = threading.Lock()           # the shared store is unwritable
+
+
+def bump_stamp(name: str) -> None:
+    """Mark everything cached for `name` (an ASX code or ALL_CODES) stale."""
+    now = time.time()
+    with _STAMP_LOCK:
+        _LOCAL_STAMPS[name] = now
+    try:
+        if os.environ.get("REDIS_URL"):
+            cache.set(f"stamp:{name}", now, timeout=0)
+        else:
+            STAMP_DIR.mkdir(parents=True, exist_ok=True)
+            (STAMP_DIR / name).touch()
+    except Exception as e:               # OSError, redis errors – local bump stands
+        print("Stamp write failed:", e)
+
+
+def read_stamp(*names: str) -> float:
+    """Newest bump_stamp() of any of `names`, from any worker; 0.0 if none."""
+    stamps = [_LOCAL_STAMPS.get(name, 0.0) for name in names]
+    try:
+        if os.environ.get("REDIS_URL"):
+            # one round-trip for all names – this runs on every lookup
+            keys = [f"stamp:{name}" for name in names]
+            stamps += [v or 0.0 for v in cache.get_many(*keys)]
+        else:
+            for name in names:
+                try:
+                    stamps.append((STAMP_DIR / name).stat().st_mtime)
+                except FileNotFoundError:
+                    pass
+    except Exception as e:
+        print("Stamp read failed:", e)
+    return max(stamps)
+
+
 # ------------------------------------------------------------------ #
 # main scrape  (InvestSMART)
 # ------------------------------------------------------------------ #
+# compiled once – only tables with a "franking" header are worth a look
+_FRANKING_TABLES = etree.XPath(
+    "//table[.//th[contains(translate(., 'FRANKING', 'franking'), 'franking')]]"
+)
+_HEADER_CELLS = etree.XPath(".//th")
+_BODY_ROWS    = etree.XPath("./tbody/tr")
+_ROW_CELLS    = etree.XPath("./td")
+
+
+@lru_cache(maxsize=64)
+def column_layout(hdrs: tuple[str, ...]) -> tuple[int, int, int] | None:
+    """
+    (ex_date_i, dividend_i, franking_i) for a table's lower-cased headers,
+    or None if it isn't the dividend table.  InvestSMART renders the same
+    headers on every page, so after the first scrape this is a dict hit.
+    """
+    cols: dict[str, int] = {}
+    for i, h in enumerate(hdrs):
+        cols.setdefault(h, i)
+    if "dividend" not in cols or "franking" not in cols:
+        return None
+    ex_i = next((i for h, i in cols.items() if "ex" in h and "date" in h), None)
+    if ex_i is None:
+        return None
+    return ex_i, cols["dividend"], cols["franking"]
+
+
+def dividend_url(code: str) -> str:
+    return f"{INVESTSMART}/shares/asx-{code.lower()}/dividends"
+
+
+_INFLIGHT: dict[tuple, Future] = {}      # _dividend_stats key → pending result
+_INFLIGHT_LOCK = threading.Lock()
+
+
 def fetch_dividend_stats(code: str) -> tuple[float | None, float | None]:
     """
     Returns (cash_dividend_last_FY, weighted_fran_pct) or (None, None)
     code: plain ASX code e.g. 'VHY'
     """
-    url = f"https://www.investsmart.com.au/shares/asx-{code.lower()}/dividends"
+    code = code.upper()
+    key = (code, *previous_fy_bounds(), read_stamp(code, ALL_CODES))
+
+    # concurrent misses for the same key share one scrape: the first caller
+    # runs it here (not on EXECUTOR – we're usually already on it), the
+    # rest wait on its future
+    with _INFLIGHT_LOCK:
+        fut = _INFLIGHT.get(key)
+        owner = fut is None
+        if owner:
+            fut = _INFLIGHT[key] = Future()
+    if owner:
+        try:
+            fut.set_result(_dividend_stats(*key))
+        except Exception as e:
+            fut.set_exception(e)
+        finally:
+            with _INFLIGHT_LOCK:
+                del _INFLIGHT[key]
 
     try:
-        res = requests.get(url, headers={"User-Agent": UA}, timeout=15)
-        res.raise_for_status()
+        return fut.result()
     except Exception as e:
-        print("InvestSMART request error:", e)
+        print("InvestSMART scrape error:", e)
         return None, None
 
-    soup = BeautifulSoup(res.text, "html.parser")
-    div_tbl = None
-    for tbl in soup.find_all("table"):
-        hdr = [th.get_text(strip=True).lower() for th in tbl.find_all("th")]
-        if {"dividend", "franking"}.issubset(hdr):
+
+@lru_cache(maxsize=1024)
+def _dividend_stats(code: str, fy_start: date, fy_end: date, stamp: float = 0.0
+                    ) -> tuple[float | None, float | None]:
+    """
+    Cached scrape behind fetch_dividend_stats – a finished FY never changes.
+    Fetch failures and a missing table raise, so they are not cached.
+    A newer invalidation `stamp` is a new key, and a stored page older than
+    it is revalidated.
+    """
+    url = dividend_url(code)
+    body = get_page(url, not_before=stamp)
+    if b"ranking" not in body:      # no (F|f)ranking header → skip the parse
+        raise LookupError(f"no dividend table on {url}")
+
+    # InvestSMART serves UTF-8; say so, or lxml falls back to latin-1
+    # ('61.79¢' → '61.79Â¢') whenever the <meta charset> is missing.  Bytes in,
+    # so an <?xml encoding=…?> prolog can't trip it.  One parser per call –
+    # lxml parsers aren't safe to share between threads
+    doc = lxml_html.fromstring(body, parser=lxml_html.HTMLParser(encoding="utf-8"))
+    div_tbl = layout = None
+    for tbl in _FRANKING_TABLES(doc):
+        layout = column_layout(
+            tuple(th.text_content().strip().lower() for th in _HEADER_CELLS(tbl))
+        )
+        if layout:
             div_tbl = tbl
             break
     if div_tbl is None:
-        return None, None
-
-    hdr = [th.get_text(strip=True).lower() for th in div_tbl.find_all("th")]
-    try:
-        ex_i   = next(i for i, h in enumerate(hdr) if "ex" in h and "date" in h)
-        div_i  = hdr.index("dividend")
-        fran_i = hdr.index("franking")
-    except (ValueError, StopIteration):
-        return None, None
+        raise LookupError(f"no dividend table on {url}")
+    ex_i, div_i, fran_i = layout
 
-    fy_start, fy_end = previous_fy_bounds()
-    tot_div_cash = tot_fran_cash = 0.0
+    amts: list[float] = []          # in-window cash amounts …
+    frans: list[float] = []         # … and their franking %, index-aligned
+    last_i = max(ex_i, div_i, fran_i)
+    prev_exd = None
 
-    for tr in div_tbl.find("tbody").find_all("tr"):
-        tds = tr.find_all("td")
-        if len(tds) <= max(ex_i, div_i, fran_i):
+    for tr in _BODY_ROWS(div_tbl):
+        tds = _ROW_CELLS(tr)
+        if len(tds) <= last_i:
             continue
 
-        exd = parse_exdate(tds[ex_i].get_text())
-        if not exd or exd < fy_start or exd > fy_end:
+        # date first – out-of-window rows never touch the other two cells
+        exd = parse_exdate(tds[ex_i].text_content())
+        if not exd:
+            continue
+        if exd < fy_start:
+            # newest-first table already past the FY: nothing older can count.
+            # Strictly older only – equal dates (special + ordinary paid the
+            # same day) also turn up in oldest-first tables
+            if prev_exd is not None and exd < prev_exd:
+                break
+            prev_exd = exd
+            continue
+        prev_exd = exd
+        if exd > fy_end:
             continue
 
-        amt = clean_amount(tds[div_i].get_text())
+        amt = clean_amount(tds[div_i].text_content())
         if amt is None:
             continue
 
         try:
-            fran_pct = float(re.sub(r"[^\d.]", "", tds[fran_i].get_text()))
+            fran_pct = float(_NON_NUM_RE.sub("", tds[fran_i].text_content()))
         except ValueError:
             fran_pct = 0.0
 
-        tot_div_cash   += amt
-        tot_fran_cash  += amt * (fran_pct / 100.0)
+        amts.append(amt)
+        frans.append(fran_pct)
 
+    # one C-level pass per total instead of float boxing in the loop
+    tot_div_cash  = sum(amts)
+    tot_fran_cash = sum(map(mul, amts, frans)) / 100.0
     if tot_div_cash == 0:
         return None, None
 
@@ -133,42 +511,196 @@ def fetch_dividend_stats(code: str) -> tuple[float | None, float | None]:
     return round(tot_div_cash, 6), weighted_pct
 
 
+# ------------------------------------------------------------------ #
+# nightly warm-up  (recently requested tickers)
+# ------------------------------------------------------------------ #
+RECENT_MAX  = 256
+REFRESH_AT  = 2                          # hour of day, Sydney time
+
+_RECENT: OrderedDict[str, None] = OrderedDict()   # ASX code, most recent last
+_RECENT_LOCK = threading.Lock()
+_refresher_started = False
+
+
+def remember_ticker(code: str) -> None:
+    """Note a code that scraped fine for the nightly warm-up; starts the refresher."""
+    global _refresher_started
+    with _RECENT_LOCK:
+        _RECENT[code] = None
+        _RECENT.move_to_end(code)
+        if len(_RECENT) > RECENT_MAX:
+            _RECENT.popitem(last=False)
+        if _refresher_started:
+            return
+        _refresher_started = True
+    # started from the first request, i.e. inside the gunicorn worker –
+    # a thread started at import would stay behind in the preload master
+    threading.Thread(target=_refresh_loop, name="div-refresh", daemon=True).start()
+
+
+def _refresh_loop() -> None:
+    while True:
+        now  = datetime.now(SYDNEY)
+        nxt  = now.replace(hour=REFRESH_AT, minute=0, second=0, microsecond=0)
+        if nxt <= now:
+            nxt += timedelta(days=1)
+        time.sleep((nxt - now).total_seconds())
+
+        with _RECENT_LOCK:
+            codes = list(_RECENT)
+        for code in codes:
+            # only codes that have scraped fine are listed, so this is a cache
+            # hit except on 1 July or after an /invalidate or /cache/clear
+            fetch_dividend_stats(code)
+
+
 # ------------------------------------------------------------------ #
 # Flask routes
 # ------------------------------------------------------------------ #
 @app.route("/")
 def home():
-    return "Stock API Proxy – call /stock?symbol=CODE  (e.g. /stock?symbol=VHY)", 200
+    return ("Stock API Proxy – call /stock?symbol=CODE  (e.g. /stock?symbol=VHY)"
+            " or /stocks?symbols=A,B,C"), 200
+
+
+def _ops_allowed() -> bool:
+    # ops hooks – disabled unless CACHE_CLEAR_TOKEN is set in the environment
+    token = os.environ.get("CACHE_CLEAR_TOKEN")
+    # constant-time; bytes so a non-ASCII header can't raise
+    return bool(token) and hmac.compare_digest(
+        request.headers.get("X-Cache-Token", "").encode(), token.encode())
+
+
+@app.route("/cache/clear", methods=["POST"])
+def cache_clear():
+    if not _ops_allowed():
+        return ojson(403, error="Forbidden")
+    bump_stamp(ALL_CODES)           # every worker re-scrapes and revalidates
+    _dividend_stats.cache_clear()   # just frees memory here; the stamp does the work
+    return ojson(cleared=True)
+
+
+@app.route("/invalidate/<ticker>", methods=["POST"])
+def invalidate(ticker: str):
+    if not _ops_allowed():
+        return ojson(403, error="Forbidden")
+    code = normalise(ticker).split(".")[0]
+    if not code.isalnum():
+        return ojson(400, error="Bad ticker")
+    bump_stamp(code)                # new cache key + page revalidation, all workers
+    return ojson(invalidated=code)
 
 
 @app.route("/stock")
+@cache.cached(query_string=True, response_filter=lambda r: r.status_code == 200)
 def stock():
     raw = request.args.get("symbol", "")
     if not raw.strip():
-        return jsonify(error="No symbol provided"), 400
+        return ojson(400, error="No symbol provided")
 
     symbol = normalise(raw)
     base   = symbol.split(".")[0]
+    if not base.isalnum():          # it ends up in a URL and a stamp file name
+        return ojson(400, error="Bad symbol")
+
+    # fire both lookups, then collect -------------------------------
+    f_price = EXECUTOR.submit(fetch_price, symbol)
+    f_div   = EXECUTOR.submit(fetch_dividend_stats, base)
+    div_deadline = time.monotonic() + SCRAPE_TIMEOUT
 
     # 1) live price --------------------------------------------------
     try:
-        price = float(yf.Ticker(symbol).fast_info["lastPrice"])
+        price = f_price.result(timeout=PRICE_TIMEOUT)
     except Exception as e:
-        return jsonify(error=f"Price fetch failed: {e}"), 500
+        return ojson(500, error=f"Price fetch failed: {e!r}")
 
     # 2) dividends & franking ---------------------------------------
-    dividend12, franking = fetch_dividend_stats(base)
-
-    return jsonify(
+    try:
+        dividend12, franking = f_div.result(
+            timeout=max(0.0, div_deadline - time.monotonic())
+        )
+    except FutureTimeout:         # not the builtin before 3.11
+        print("InvestSMART scrape timed out:", base)
+        dividend12 = franking = None
+    if dividend12 is not None:      # bad or failing codes aren't worth a nightly retry
+        remember_ticker(base)
+
+    resp = ojson(
         symbol     = symbol,
         price      = price,
         dividend12 = dividend12,
         franking   = franking
     )
+    resp.last_modified = time.time()     # stored with it – see cache_headers
+    return resp
+
+
+def _cacheable(resp: Response) -> bool:
+    # 200s only, and not a batch that carries per-symbol errors (no-store)
+    return resp.status_code == 200 and "Cache-Control" not in resp.headers
+
+
+@app.route("/stocks")
+@cache.cached(query_string=True, response_filter=_cacheable)
+def stocks():
+    """Watchlist form of /stock:  /stocks?symbols=VHY,CBA,BHP  → JSON list."""
+    raw = request.args.get("symbols", "")
+    symbols = list(dict.fromkeys(normalise(s) for s in raw.split(",") if s.strip()))
+    if not symbols:
+        return ojson(400, error="No symbols provided")
+    if len(symbols) > MAX_BATCH:
+        return ojson(400, error=f"At most {MAX_BATCH} symbols per call")
+    bad = [s for s in symbols if not s.split(".")[0].isalnum()]
+    if bad:
+        return ojson(400, error=f"Bad symbol: {bad[0]}")
+
+    # every lookup in flight at once; cached symbols return immediately
+    start = time.monotonic()
+    f_prices = {s: EXECUTOR.submit(fetch_price, s) for s in symbols}
+    f_divs   = {s: EXECUTOR.submit(fetch_dividend_stats, s.split(".")[0])
+                for s in symbols}
+
+    out = []
+    for symbol in symbols:
+        try:
+            price = f_prices[symbol].result(
+                timeout=max(0.0, start + PRICE_TIMEOUT - time.monotonic())
+            )
+        except Exception as e:
+            out.append({"symbol": symbol, "error": f"Price fetch failed: {e!r}"})
+            continue
+        try:
+            dividend12, franking = f_divs[symbol].result(
+                timeout=max(0.0, start + SCRAPE_TIMEOUT - time.monotonic())
+            )
+        except FutureTimeout:
+            dividend12 = franking = None
+        if dividend12 is not None:
+            remember_ticker(symbol.split(".")[0])
+        out.append({"symbol": symbol, "price": price,
+                    "dividend12": dividend12, "franking": franking})
+
+    resp = ojson(200, out)
+    resp.last_modified = time.time()
+    if any("error" in item for item in out):
+        # one symbol's Yahoo blip shouldn't be served for RESPONSE_TTL
+        resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+@app.after_request
+def cache_headers(resp):
+    # let a CDN / browser absorb dashboard polling too – but only for what is
+    # left of RESPONSE_TTL, so a hit on a 50s-old cached answer isn't handed
+    # out downstream for another full minute
+    if request.endpoint in ("stock", "stocks") and _cacheable(resp):
+        built = resp.last_modified          # whole seconds, set by the view
+        age = int(time.time() - built.timestamp()) if built else 0
+        resp.headers["Cache-Control"] = f"public, max-age={max(0, RESPONSE_TTL - age)}"
+    return resp
 
 
 # ------------------------------------------------------------------ #
-if __name__ == "__main__":
-    # local dev:  python app.py
-    app.run(host="0.0.0.0", port=8080)
+# serve with:  gunicorn -c gunicorn.conf.py app:app
+# local dev:   python main.py
 
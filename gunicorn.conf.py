@@ -0,0 +1,31 @@
+# gunicorn.conf.py  –  production server settings
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# /stock spends nearly all its time waiting on Yahoo and InvestSMART, so
+# each worker runs a pool of threads to keep many upstream calls in flight.
+# Real threads rather than gevent: yfinance talks to Yahoo through
+# curl_cffi, which monkey-patching can't make cooperative, and app.py
+# already fans lookups out over its own thread pool.
+import multiprocessing
+import os
+import threading
+
+bind         = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+worker_class = "gthread"
+workers      = int(os.environ.get("WEB_CONCURRENCY",
+                                  multiprocessing.cpu_count() * 2 + 1))
+threads      = 8
+timeout      = 30
+keepalive    = 30          # hold client connections open between polls
+
+# import app.py once in the master; workers fork from it copy-on-write.
+# Nothing at import time starts a thread or opens a socket, so the fork
+# is safe (executor threads and HTTP connections are created lazily).
+preload_app  = True
+
+
+def post_worker_init(worker):
+    # after the fork, so each worker gets its own socket; in the background
+    # so a slow upstream doesn't hold up the worker accepting requests
+    from app import warm_pool
+    threading.Thread(target=warm_pool, name="warm-pool", daemon=True).start()
@@ -1,4 +1,5 @@
 from app import app
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # debugger/reloader only when asked for: FLASK_DEBUG=1 python main.py
+    app.run(host='0.0.0.0', port=5000)
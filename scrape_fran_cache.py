@@ -7,18 +7,33 @@ import unicodedata
 from pathlib import Path
 from datetime import datetime, timedelta
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+from lxml import html as lxml_html
 
 # ─── Configuration ──────────────────────────────────────────────
 CACHE     = Path("franking_cache.json")
 ASX_CODES = ["VHY"]         # ← add any ASX codes you want cached
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+HEADERS    = {
+    "User-Agent":      USER_AGENT,
+    "Accept":          "text/html",
+    "Accept-Encoding": "gzip, deflate, br",
+}
+SESSION    = requests.Session()   # one connection reused across ASX_CODES
+SESSION.headers.update(HEADERS)
+SESSION.mount("https://", HTTPAdapter(
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+))
 # ────────────────────────────────────────────────────────────────
 
+NON_NUM_RE  = re.compile(r"[^\d.]")
+UTF8_PARSER = lxml_html.HTMLParser(encoding="utf-8")   # page may omit <meta charset>
+
 def clean_num(txt: str) -> float:
     """Strip out non-numeric except dot, return float."""
     s = unicodedata.normalize("NFKD", txt)
-    s = re.sub(r"[^\d.]", "", s) or "0"
+    s = NON_NUM_RE.sub("", s) or "0"
     return float(s)
 
 def fetch_franking_asx(code: str):
@@ -27,27 +42,29 @@ def fetch_franking_asx(code: str):
     Returns weighted franking % over last 365 days or None.
     """
     url = f"https://www.investsmart.com.au/shares/asx-{code.lower()}/dividends"
-    headers = {"User-Agent": USER_AGENT}
-    resp = requests.get(url, headers=headers, timeout=15)
+    resp = SESSION.get(url, timeout=(3.05, 15))   # (connect, read)
     resp.raise_for_status()
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-    table = soup.find("table")
-    if not table or not table.tbody:
+    doc   = lxml_html.fromstring(resp.content, parser=UTF8_PARSER)
+    table = doc.find(".//table")
+    tbody = table.find("tbody") if table is not None else None
+    if tbody is None:
         print(f"‼️  No table found for {code}")
         return None
 
     cutoff = datetime.utcnow().date() - timedelta(days=365)
     tot_div = tot_frank = 0.0
-    rows = table.tbody.find_all("tr")
+    rows = tbody.findall("tr")
     print(f"🔍 Found {len(rows)} rows for {code}")
 
     for tr in rows:
-        tds = tr.find_all("td")
+        tds = tr.findall("td")
         if len(tds) < 6:
             continue
 
-        date_txt  = tds[5].get_text(strip=True)
+        # text_content() is one C-level walk per cell; split/join collapses
+        # newlines / nbsp runs inside the date
+        date_txt  = " ".join(tds[5].text_content().split())
         try:
             ex_date = datetime.strptime(date_txt, "%d %b %Y").date()
         except ValueError:
@@ -55,10 +72,8 @@ def fetch_franking_asx(code: str):
         if ex_date < cutoff:
             continue
 
-        amt_txt   = tds[3].get_text(strip=True)
-        frank_txt = tds[4].get_text(strip=True)
-        amt   = clean_num(amt_txt)
-        frank = clean_num(frank_txt)
+        amt   = clean_num(tds[3].text_content())
+        frank = clean_num(tds[4].text_content())
         tot_div   += amt
         tot_frank += amt * (frank / 100.0)
 